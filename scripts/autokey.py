@@ -10,8 +10,12 @@
 # ------------------------------------------------------ IMPORTS -------------------------------------------------------
 
 import argparse
-from msvcrt import getch
+import functools
+from msvcrt import getch, kbhit
+import queue
 import re
+import sys
+import threading
 
 from superkey import *
 
@@ -23,6 +27,58 @@ _ASCII_NEWLINE = 0x0D
 _ASCII_ESCAPE = 0x1B
 _ASCII_BACKSLASH = 0x5C
 
+# Prefix bytes returned by getch() ahead of the scan code for function and arrow keys
+_GETCH_SPECIAL_KEY_PREFIXES = (0x00, 0xE0)
+
+# Autokey flags used for all but the final character of a prosign
+_NO_LETTER_SPACE_FLAGS = (AutokeyFlag.NO_LETTER_SPACE,)
+
+# Messages to print for each error type returned by the interface
+_ERROR_MESSAGES = {
+    InvalidMessageError:    'invalid message!',
+    InvalidSizeError:       'invalid size!',
+    InvalidCRCError:        'invalid CRC!',
+    InvalidPayloadError:    'invalid payload!',
+    InvalidValueError:      'invalid value!',
+}
+
+# Maximum number of lines of text which may be waiting to be sent in buffered mode before input blocks
+_BUFFERED_QUEUE_SIZE = 16
+
+# Maximum number of characters to buffer in immediate mode before sending them to the keyer
+_IMMEDIATE_BATCH_SIZE = 8
+
+# Lookup table of character codes which are valid Morse code characters (nonzero if code is valid)
+_AUTOKEY_TABLE = bytearray(256)
+for _code in (0x20,                           # space
+              0x21,                           # exclamation mark
+              0x22,                           # double quote
+              0x27,                           # single quote
+              0x2B,                           # plus
+              0x2C,                           # comma
+              0x2D,                           # dash
+              0x2E,                           # period
+              0x2F,                           # slash
+              *range(0x30, 0x3A),             # digit
+              0x3D,                           # equals
+              0x3F,                           # question mark
+              *range(0x41, 0x5B),             # upper case letter
+              0x5F,                           # underscore
+              *range(0x61, 0x7B)):            # lower case letter
+    _AUTOKEY_TABLE[_code] = 1
+_AUTOKEY_TABLE = bytes(_AUTOKEY_TABLE)
+del _code
+
+# Character codes which are not valid Morse code characters, for use with `bytes.translate`
+_AUTOKEY_INVALID = bytes(code for code in range(256) if _AUTOKEY_TABLE[code] == 0)
+
+# Regular expressions for quick message commands
+_RE_QM_GET = re.compile(r'^:qm get (\d+)$', re.IGNORECASE)
+_RE_QM_SET = re.compile(r'^:qm set (\d+) (.+)$', re.IGNORECASE)
+_RE_QM_DEL = re.compile(r'^:qm del (\d+)$', re.IGNORECASE)
+_RE_QM_KEY = re.compile(r'^:qm (\d+)$', re.IGNORECASE)
+_RE_QM_KEY_SHORT = re.compile(r'^:(\d+)$')
+
 # ----------------------------------------------------- PROCEDURES -----------------------------------------------------
 
 def _parse_args():
@@ -42,21 +98,14 @@ def _should_autokey(code: int) -> bool:
     """
     Returns `True` if the character with the specified ASCII code is a valid Morse code character.
     """
-    return (code == 0x20 or                       # space
-            code == 0x21 or                       # exclamation mark
-            code == 0x22 or                       # double quote
-            code == 0x27 or                       # single quote
-            code == 0x2B or                       # plus
-            code == 0x2C or                       # comma
-            code == 0x2D or                       # dash
-            code == 0x2E or                       # period
-            code == 0x2F or                       # slash
-            (code >= 0x30 and code <= 0x39) or    # digit
-            code == 0x3D or                       # equals
-            code == 0x3F or                       # question mark
-            (code >= 0x41 and code <= 0x5A) or    # upper case letter
-            code == 0x5F or                       # underscore
-            (code >= 0x61 and code <= 0x7A))      # lower case letter
+    return _AUTOKEY_TABLE[code] != 0
+
+
+def _strip_invalid(string: str) -> str:
+    """
+    Returns the specified string with any characters which are not valid Morse code characters removed.
+    """
+    return string.encode('latin-1', errors='ignore').translate(None, _AUTOKEY_INVALID).decode('ascii')
 
 
 def _buffered_mode(port: str = SUPERKEY_DEFAULT_PORT,
@@ -66,183 +115,195 @@ def _buffered_mode(port: str = SUPERKEY_DEFAULT_PORT,
     Runs the autokeyer in buffered mode.
     """
     with Interface(port=port, baudrate=baudrate, timeout=timeout) as intf:
-        while True:
-            try:
-
-                # Get next input from user
-                line = input('> ')
 
-                # Helper functions
-                def line_equals(x: str) -> bool:
-                    return line.casefold() == x.casefold()
-                def line_starts_with(x: str) -> bool:
-                    return line.casefold().startswith(x.casefold())
-
-                # Check for special commands
-                if line_equals(':q') or line_equals(':quit') or line_equals(':exit'):
-                    # Exit program
-                    break
+        # Command handlers - each accepts the full (non-casefolded) input line
+        def print_wpm(line: str):
+            print(f'WPM: {intf.get_wpm():.1f}')
 
-                elif line_equals(':!') or line_equals(':panic'):
-                    # Panic
-                    intf.panic()
-                    continue
+        def set_wpm(line: str):
+            try:
+                intf.set_wpm(float(line[5:]))
+            except ValueError:
+                print('Invalid WPM?')
 
-                elif line_equals(':wpm'):
-                    # Print WPM status
-                    print(f'WPM: {intf.get_wpm():.1f}')
-                    continue
+        def print_buzzer(line: str):
+            print(f'Buzzer: {'On' if intf.get_buzzer_enabled() else 'Off'} ({intf.get_buzzer_frequency()} Hz)')
 
-                elif line_starts_with(':wpm '):
-                    # Set WPM
-                    try:
-                        intf.set_wpm(float(line[5:]))
-                    except ValueError:
-                        print('Invalid WPM?')
-                    continue
+        def set_buzzer_frequency(line: str):
+            try:
+                intf.set_buzzer_frequency(int(line[18:]))
+            except ValueError:
+                print('Invalid frequency?')
+
+        def print_paddle_mode(line: str):
+            mode = intf.get_paddle_mode()
+            if mode == PaddleMode.IAMBIC:
+                print('Paddle mode: Iambic')
+            elif mode == PaddleMode.ULTIMATIC:
+                print('Paddle mode: Ultimatic')
+            elif mode == PaddleMode.ULTIMATIC_ALTERNATE:
+                print('Paddle mode: Ultimatic Alternate')
+            else:
+                print('Paddle mode: unknown?')
 
-                elif line_equals(':buzzer'):
-                    # Print buzzer status
-                    print(f'Buzzer: {'On' if intf.get_buzzer_enabled() else 'Off'} ({intf.get_buzzer_frequency()} Hz)')
-                    continue
+        def print_trainer_mode(line: str):
+            print(f'Trainer mode: {'On' if intf.get_trainer_mode() else 'Off'}')
 
-                elif line_equals(':buzzer off'):
-                    # Turn buzzer off
-                    intf.set_buzzer_enabled(False)
-                    continue
+        def print_quick_msgs(line: str):
+            for idx in range(16):
+                if msg := intf.get_quick_msg(idx):
+                    print(f'QM {idx}: {msg}')
+                else:
+                    print(f'QM {idx}: [empty]')
+
+        def quick_msg(line: str):
+            # Handle this with regex for easier processing
+            if match := _RE_QM_GET.match(line):
+                print(intf.get_quick_msg(int(match.group(1))))
+            elif match := _RE_QM_SET.match(line):
+                intf.set_quick_msg(int(match.group(1)), match.group(2))
+            elif match := _RE_QM_DEL.match(line):
+                intf.invalidate_quick_msg(int(match.group(1)))
+            elif match := _RE_QM_KEY.match(line):
+                intf.autokey_quick_msg(int(match.group(1)))
+            else:
+                print('Unknown quick message command?')
 
-                elif line_equals(':buzzer on'):
-                    # Turn buzzer on
-                    intf.set_buzzer_enabled(True)
-                    continue
+        def set_humanizer_level(line: str):
+            try:
+                intf.set_humanizer_level(float(line[10:]))
+            except ValueError:
+                print('Invalid level?')
+
+        # Commands which must match the (casefolded) line exactly
+        exact_commands = {
+            ':!':                           lambda line: intf.panic(),
+            ':panic':                       lambda line: intf.panic(),
+            ':wpm':                         print_wpm,
+            ':buzzer':                      print_buzzer,
+            ':buzzer off':                  lambda line: intf.set_buzzer_enabled(False),
+            ':buzzer on':                   lambda line: intf.set_buzzer_enabled(True),
+            ':paddle':                      print_paddle_mode,
+            ':paddle iambic':               lambda line: intf.set_paddle_mode(PaddleMode.IAMBIC),
+            ':paddle ultimatic':            lambda line: intf.set_paddle_mode(PaddleMode.ULTIMATIC),
+            ':paddle ultimatic_alternate':  lambda line: intf.set_paddle_mode(PaddleMode.ULTIMATIC_ALTERNATE),
+            ':trainer':                     print_trainer_mode,
+            ':trainer on':                  lambda line: intf.set_trainer_mode(True),
+            ':trainer off':                 lambda line: intf.set_trainer_mode(False),
+            ':qm list':                     print_quick_msgs,
+            ':version':                     lambda line: print(intf.version()),
+            ':humanizer':                   lambda line: print(intf.get_humanizer_level()),
+        }
+
+        # Commands which are matched by prefix, checked in order if there was no exact match
+        prefix_commands = (
+            (':wpm ',                       set_wpm),
+            (':buzzer frequency ',          set_buzzer_frequency),
+            (':qm',                         quick_msg),
+            (':humanizer',                  set_humanizer_level),
+        )
+
+        # Helper function to split a line into tokens and send them in either normal or prosign mode
+        def send_text(line: str):
+            tokens = line.split('\\')
+            segments = []
+            prosign = 0
+            for token in tokens:
+                token = _strip_invalid(token)
+                if prosign and len(token) > 1:
+                    segments.append((token[:-1], _NO_LETTER_SPACE_FLAGS))
+                    segments.append((token[-1], ()))
+                elif len(token) != 0:
+                    segments.append((token, ()))
+                prosign ^= 1
+            if len(segments) != 0:
+                intf.autokey_batch(segments)
+
+        # Text is sent by a background thread so the user can keep typing - errors are passed back to this thread
+        transactions = queue.Queue(maxsize=_BUFFERED_QUEUE_SIZE)
+        errors = queue.Queue()
+        failed = threading.Event()
+
+        def run_transactions():
+            while (transaction := transactions.get()) is not None:
+                try:
+                    # After an unexpected error (e.g., the device was unplugged) the remaining text is discarded, but
+                    # the queue is still drained so that the main thread never blocks on it
+                    if not failed.is_set():
+                        transaction()
+                except InterfaceError as error:
+                    errors.put(error)
+                except Exception as error:
+                    errors.put(error)
+                    failed.set()
+                finally:
+                    transactions.task_done()
+
+        def print_error(error: InterfaceError):
+            print(f'SuperKey responds: {_ERROR_MESSAGES.get(type(error), 'unknown error!')}')
+
+        def report_errors():
+            # Interface errors are reported in the order they occurred - unexpected errors end the program
+            while not errors.empty():
+                error = errors.get()
+                if not isinstance(error, InterfaceError):
+                    raise error
+                print_error(error)
+
+        thread = threading.Thread(target=run_transactions, daemon=True)
+        thread.start()
 
-                elif line_starts_with(':buzzer frequency '):
-                    # Set buzzer frequency
-                    try:
-                        intf.set_buzzer_frequency(int(line[18:]))
-                    except ValueError:
-                        print('Invalid frequency?')
-                    continue
+        while True:
+            try:
 
-                elif line_equals(':paddle'):
-                    # Print paddle mode
-                    mode = intf.get_paddle_mode()
-                    if mode == PaddleMode.IAMBIC:
-                        print('Paddle mode: Iambic')
-                    elif mode == PaddleMode.ULTIMATIC:
-                        print('Paddle mode: Ultimatic')
-                    elif mode == PaddleMode.ULTIMATIC_ALTERNATE:
-                        print('Paddle mode: Ultimatic Alternate')
-                    else:
-                        print('Paddle mode: unknown?')
-                    continue
+                # Report any error raised while sending text in the background
+                report_errors()
 
-                elif line_equals(':paddle iambic'):
-                    # Set paddles to iambic mode
-                    intf.set_paddle_mode(PaddleMode.IAMBIC)
-                    continue
+                # Get next input from user
+                line = input('> ')
+                lc = line.casefold()
 
-                elif line_equals(':paddle ultimatic'):
-                    # Set paddles to ultimatic mode
-                    intf.set_paddle_mode(PaddleMode.ULTIMATIC)
+                # Queue anything that isn't a command to be sent to the keyer
+                if not lc.startswith(':'):
+                    transactions.put(functools.partial(send_text, line))
                     continue
 
-                elif line_equals(':paddle ultimatic_alternate'):
-                    # Set paddles to ultimatic alternate mode
-                    intf.set_paddle_mode(PaddleMode.ULTIMATIC_ALTERNATE)
-                    continue
+                # Commands use the serial port directly, so wait until the background thread is idle
+                transactions.join()
 
-                elif line_equals(':trainer'):
-                    # Print trainer mode status
-                    print(f'Trainer mode: {'On' if intf.get_trainer_mode() else 'Off'}')
-                    continue
+                # Report errors from text sent before this command, so they aren't lost on exit or printed out of order
+                report_errors()
 
-                elif line_equals(':trainer on'):
-                    # Enable trainer mode
-                    intf.set_trainer_mode(True)
-                    continue
+                # Check for special commands
+                if lc == ':q' or lc == ':quit' or lc == ':exit':
+                    # Exit program
+                    break
 
-                elif line_equals(':trainer off'):
-                    # Disable trainer mode
-                    intf.set_trainer_mode(False)
-                    continue
+                elif handler := exact_commands.get(lc):
+                    # Command with no arguments
+                    handler(line)
 
-                elif line_starts_with(':qm'):
-                    # Handle this with regex for easier processing
-                    if line_equals(':qm list'):
-                        for idx in range(16):
-                            if msg := intf.get_quick_msg(idx):
-                                print(f'QM {idx}: {msg}')
-                            else:
-                                print(f'QM {idx}: [empty]')
-                        continue
-                    elif match := re.match(r'^:qm get (\d+)$', line, re.IGNORECASE):
-                        print(intf.get_quick_msg(int(match.group(1))))
-                        continue
-                    elif match := re.match(r'^:qm set (\d+) (.+)$', line, re.IGNORECASE):
-                        intf.set_quick_msg(int(match.group(1)), match.group(2))
-                        continue
-                    elif match := re.match(r'^:qm del (\d+)$', line, re.IGNORECASE):
-                        intf.invalidate_quick_msg(int(match.group(1)))
-                        continue
-                    elif match := re.match(r'^:qm (\d+)$', line, re.IGNORECASE):
-                        intf.autokey_quick_msg(int(match.group(1)))
-                        continue
+                else:
+                    # Command with arguments
+                    for prefix, handler in prefix_commands:
+                        if lc.startswith(prefix):
+                            handler(line)
+                            break
                     else:
-                        print('Unknown quick message command?')
-                        continue
-
-                elif line_equals(':version'):
-                    # Print version information
-                    print(intf.version())
-                    continue
-
-                elif line_equals(':humanizer'):
-                    # Print humanizer level
-                    print(intf.get_humanizer_level())
-                    continue
-
-                elif line_starts_with(':humanizer'):
-                    # Set humanizer level
-                    try:
-                        intf.set_humanizer_level(float(line[10:]))
-                    except ValueError:
-                        print('Invalid level?')
-                    continue
-
-                elif match := re.match(r'^:(\d+)$', line, re.IGNORECASE):
-                    intf.autokey_quick_msg(int(match.group(1)))
-                    continue
-
-                elif line_starts_with(':'):
-                    # Unknown command?
-                    print('Unknown command?')
-                    continue
-
-                # Split line into tokens and send in either normal or prosign mode
-                tokens = line.split('\\')
-                prosign = False
-                for token in tokens:
-                    if prosign and len(token) > 1:
-                        intf.autokey(token[:-1], flags=[AutokeyFlag.NO_LETTER_SPACE])
-                        intf.autokey(token[-1])
-                    elif len(token) != 0:
-                        intf.autokey(token)
-                    prosign = not prosign
+                        if match := _RE_QM_KEY_SHORT.match(line):
+                            intf.autokey_quick_msg(int(match.group(1)))
+                        else:
+                            # Unknown command?
+                            print('Unknown command?')
 
             # Ultra-graceful error handling
-            except InvalidMessageError:
-                print('SuperKey responds: invalid message!')
-            except InvalidSizeError:
-                print('SuperKey responds: invalid size!')
-            except InvalidCRCError:
-                print('SuperKey responds: invalid CRC!')
-            except InvalidPayloadError:
-                print('SuperKey responds: invalid payload!')
-            except InvalidValueError:
-                print('SuperKey responds: invalid value!')
-            except InterfaceError:
-                print('SuperKey responds: unknown error!')
+            except InterfaceError as error:
+                print_error(error)
+
+        # Report any remaining errors, then stop the background thread
+        report_errors()
+        transactions.put(None)
+        thread.join()
 
 
 def _immediate_mode(port: str = SUPERKEY_DEFAULT_PORT,
@@ -264,62 +325,96 @@ def _immediate_mode(port: str = SUPERKEY_DEFAULT_PORT,
 
         # Tracking variables
         prosign_active = False
-        prosign_string = ''
+        prosign_chars = []
+        pending = []
+        echoed = []
 
-        # Loop until commanded to quit
-        while True:
+        # Helper function to send any buffered characters to the keyer
+        def flush():
+            if len(pending) != 0:
+                intf.autokey(''.join(pending))
+                pending.clear()
 
-            # Get byte for user keypresse
-            inpt = getch()
-            assert(len(inpt) == 1)
-            code = inpt[0]
+        # Helper function to handle a single keypress - returns `False` if the user requested to quit
+        def handle_key(code: int) -> bool:
+            nonlocal prosign_active
+
+            # Consume and ignore the scan code following a special key prefix
+            if code in _GETCH_SPECIAL_KEY_PREFIXES:
+                getch()
+                return True
 
             # Exit if user pressed escape key
             if code == _ASCII_ESCAPE:
-                break
+                return False
 
-            # Panic if the user pressed backspace key
+            # Panic if the user pressed backspace key (discarding anything not yet sent)
             if code == _ASCII_BACKSPACE:
+                pending.clear()
                 intf.panic()
-                continue
+                return True
 
             # Start a prosign if the user pressed backslash key
             if code == _ASCII_BACKSLASH:
-                print(chr(_ASCII_BACKSLASH), end='', flush=True)
+                flush()
+                echoed.append(chr(_ASCII_BACKSLASH))
                 prosign_active = not prosign_active
                 if prosign_active:
-                    prosign_string = ''
-                    continue
+                    prosign_chars.clear()
+                    return True
 
             # Ignore unknown characters, but allow newlines to print
             should_autokey = _should_autokey(code)
             should_print = should_autokey or code == _ASCII_NEWLINE
+            if not should_print and code != _ASCII_BACKSLASH:
+                return True
 
             # Convert character code to string, fixing newlines
-            if code != _ASCII_NEWLINE:
-                char = chr(code)
-            else:
-                char = '\r\n'
+            char = '\r\n' if code == _ASCII_NEWLINE else chr(code)
 
             # Handle prosigns
             if prosign_active and should_autokey:
-                prosign_string += char
-            elif not prosign_active and len(prosign_string) != 0:
+                prosign_chars.append(char)
+            elif not prosign_active and len(prosign_chars) != 0:
                 assert code == _ASCII_BACKSLASH, 'Logic error!'
+                prosign_string = ''.join(prosign_chars)
                 if len(prosign_string) > 1:
-                    intf.autokey(prosign_string[:-1], [AutokeyFlag.NO_LETTER_SPACE])
-                    intf.autokey(prosign_string[-1])
+                    intf.autokey_batch(((prosign_string[:-1], _NO_LETTER_SPACE_FLAGS), (prosign_string[-1], ())))
                 else:
                     intf.autokey(prosign_string)
-                prosign_string = ''
+                prosign_chars.clear()
 
-            # Send character to keyer
+            # Buffer character, sending it to the keyer early if the buffer is full
             elif should_autokey:
-                intf.autokey(char)
+                pending.append(char)
+                if len(pending) >= _IMMEDIATE_BATCH_SIZE:
+                    flush()
+
+            # Send anything buffered on newlines
+            if code == _ASCII_NEWLINE:
+                flush()
 
-            # Send character to console
+            # Buffer character for console
             if echo and should_print:
-                print(char, end='', flush=True)
+                echoed.append(char)
+
+            return True
+
+        # Loop until commanded to quit
+        running = True
+        while running:
+
+            # Block until the user presses a key, then drain any other keys which are already waiting
+            running = handle_key(getch()[0])
+            while running and kbhit():
+                running = handle_key(getch()[0])
+
+            # Send the whole burst to the keyer and the console at once
+            flush()
+            if len(echoed) != 0:
+                sys.stdout.write(''.join(echoed))
+                sys.stdout.flush()
+                echoed.clear()
 
 # --------------------------------------------------- MAIN PROCEDURE ---------------------------------------------------
 
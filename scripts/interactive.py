@@ -13,8 +13,10 @@
 
 # ------------------------------------------------------ IMPORTS -------------------------------------------------------
 
-from superkey.interface import Interface, InteractiveInterface
-from superkey.types import *
+import code
+
+from superkey.interface import InteractiveInterface
+from superkey import types
 
 # ----------------------------------------------------- PROCEDURES -----------------------------------------------------
 
@@ -38,18 +40,10 @@ args = parse_args()
 # Build interactive interface
 sk = InteractiveInterface(port=args.port, baudrate=args.baudrate, timeout=args.timeout)
 
-# Inject all public callable methods into globals
-for name in dir(sk._InteractiveInterface__intf):
-    if not name.startswith('_'):
-        attr = getattr(sk, name)
-        if callable(attr):
-            globals()[name] = attr
-
-# Clean up namespace
-del args, attr, name, parse_args, sk, Interface, InteractiveInterface
+# Build the REPL's namespace directly, containing all types and all public methods of the interface
+namespace = { '__name__': '__console__', '__doc__': None }
+namespace.update((name, getattr(types, name)) for name in types.__all__)
+namespace.update((name, getattr(sk, name)) for name in InteractiveInterface.PUBLIC_METHODS)
 
 # Start a child Python REPL with the environment that we have oh-so-carefully curated
-import code
-l = dict(locals())
-del l['code']
-code.interact(local=l)
+code.interact(local=namespace)
@@ -9,6 +9,55 @@
 
 # ------------------------------------------------------ IMPORTS -------------------------------------------------------
 
-from .constants import *
-from .interface import *
-from .types import *
+from .constants import (
+    SUPERKEY_DEFAULT_PORT,
+    SUPERKEY_DEFAULT_BAUDRATE,
+    SUPERKEY_DEFAULT_TIMEOUT,
+)
+from .interface import (
+    InterfaceError,
+    InvalidMessageError,
+    InvalidSizeError,
+    InvalidCRCError,
+    InvalidPayloadError,
+    InvalidValueError,
+    Interface,
+    InteractiveInterface,
+)
+from .types import (
+    AutokeyFlag,
+    CodeElement,
+    IOPin,
+    IOPolarity,
+    IOType,
+    LED,
+    MessageID,
+    PaddleMode,
+)
+
+# ------------------------------------------------------ EXPORTS -------------------------------------------------------
+
+__all__ = [
+    # Constants
+    'SUPERKEY_DEFAULT_PORT',
+    'SUPERKEY_DEFAULT_BAUDRATE',
+    'SUPERKEY_DEFAULT_TIMEOUT',
+    # Interface
+    'InterfaceError',
+    'InvalidMessageError',
+    'InvalidSizeError',
+    'InvalidCRCError',
+    'InvalidPayloadError',
+    'InvalidValueError',
+    'Interface',
+    'InteractiveInterface',
+    # Types
+    'AutokeyFlag',
+    'CodeElement',
+    'IOPin',
+    'IOPolarity',
+    'IOType',
+    'LED',
+    'MessageID',
+    'PaddleMode',
+]
@@ -0,0 +1,84 @@
+#
+# @file     scripts/superkey/crc.py
+# @brief    Module defining the CRC16 algorithm used by the SuperKey interface.
+#
+# @author   Chris Vig (chris@invictus.so)
+# @date     2026-10-15
+# @cpyrt    © 2026 by Chris Vig. Licensed under the GNU General Public License v3 (GPLv3).
+#
+
+# ------------------------------------------------------ IMPORTS -------------------------------------------------------
+
+# Use the optional `fastcrc` package (a compiled CRC library) if it is installed
+try:
+    from fastcrc.crc16 import modbus as _fastcrc_modbus
+except ImportError:
+    _fastcrc_modbus = None
+
+# ------------------------------------------------------ EXPORTS -------------------------------------------------------
+
+__all__ = [
+    'CRC16_SEED',
+    'crc16',
+    'crc16_u8',
+    'crc16_u16',
+]
+
+# ----------------------------------------------------- CONSTANTS ------------------------------------------------------
+
+# Initial value for CRC16 calculations
+CRC16_SEED = 0xFFFF
+
+# CRC16 lookup table (polynomial 0xA001, as used by avrlibc _crc16_update), indexed by the low byte of (CRC ^ data)
+_CRC16_TABLE = []
+for _byte in range(256):
+    _crc = _byte
+    for _bit in range(8):
+        _crc = (_crc >> 1) ^ 0xA001 if _crc & 1 else _crc >> 1
+    _CRC16_TABLE.append(_crc)
+_CRC16_TABLE = tuple(_CRC16_TABLE)
+del _byte, _bit, _crc
+
+# CRC16 (from the default seed) of every possible single-byte buffer
+_CRC16_U8_TABLE = tuple((CRC16_SEED >> 8) ^ _CRC16_TABLE[(CRC16_SEED ^ _byte) & 0xFF] for _byte in range(256))
+
+# ----------------------------------------------------- PROCEDURES -----------------------------------------------------
+
+def _crc16_python(buffer: bytes, seed: int = CRC16_SEED) -> int:
+    """
+    Returns a 16-bit CRC for the specified buffer, calculated in pure Python.
+    """
+    # Equivalent to avrlibc _crc16_update, processing one byte per table lookup
+    crc = seed
+    for b in buffer:
+        crc = (crc >> 8) ^ _CRC16_TABLE[(crc ^ b) & 0xFF]
+    return crc
+
+
+def _crc16_fastcrc(buffer: bytes, seed: int = CRC16_SEED) -> int:
+    """
+    Returns a 16-bit CRC for the specified buffer, calculated by `fastcrc`.
+    """
+    # This is the CRC-16/MODBUS algorithm (reflected polynomial 0xA001), which is identical to _crc16_update
+    return _fastcrc_modbus(buffer, seed)
+
+
+def crc16_u8(value: int) -> int:
+    """
+    Returns a 16-bit CRC for a buffer containing the specified 8-bit value, using the default seed.
+    """
+    # Fixed-size payloads don't need the general loop - this is a single table lookup
+    return _CRC16_U8_TABLE[value]
+
+
+def crc16_u16(value: int) -> int:
+    """
+    Returns a 16-bit CRC for a buffer containing the specified 16-bit value (little-endian), using the default seed.
+    """
+    # The low byte comes first on the wire, so it is processed first
+    crc = _CRC16_U8_TABLE[value & 0xFF]
+    return (crc >> 8) ^ _CRC16_TABLE[(crc ^ (value >> 8)) & 0xFF]
+
+
+# Returns a 16-bit CRC for the specified buffer
+crc16 = _crc16_fastcrc if _fastcrc_modbus is not None else _crc16_python
@@ -9,12 +9,16 @@
 
 # ------------------------------------------------------ IMPORTS -------------------------------------------------------
 
+import contextlib
+import inspect
 import serial
 import struct
+import threading
 import time
 from typing import Iterable, Optional, Tuple
 
 from .constants import *
+from .crc import crc16, crc16_u8, crc16_u16
 from .types import *
 
 # ------------------------------------------------------ EXPORTS -------------------------------------------------------
@@ -34,7 +38,114 @@ __all__ = [
 
 # Header
 HEADER_STRUCT_FORMAT = '<HxxHH'
-HEADER_STRUCT_SIZE = struct.calcsize(HEADER_STRUCT_FORMAT)
+HEADER_STRUCT = struct.Struct(HEADER_STRUCT_FORMAT)
+HEADER_STRUCT_SIZE = HEADER_STRUCT.size
+
+# Shortest interval (in seconds) between polls in `Interface.autokey_wait`
+AUTOKEY_WAIT_MINIMUM_DELAY = 0.02
+
+# Default time (in seconds) for which `InteractiveInterface` keeps the serial port open after a command
+INTERACTIVE_DEFAULT_IDLE_TIMEOUT = 0.5
+
+# Structs for command and reply payloads
+_U8_STRUCT = struct.Struct('<B')
+_I8_STRUCT = struct.Struct('<b')
+_BOOL_STRUCT = struct.Struct('<?')
+_U16_STRUCT = struct.Struct('<H')
+_F32_STRUCT = struct.Struct('<f')
+_U8_U8_STRUCT = struct.Struct('<BB')
+_U8_BOOL_STRUCT = struct.Struct('<B?')
+_U8_F32_STRUCT = struct.Struct('<Bf')
+
+# Methods of `Interface` which span several commands, so can't be wrapped in a single `InteractiveInterface` transaction
+_INTERACTIVE_UNPROXIED_METHODS = frozenset(('batch',))
+
+# Prebuilt packets for commands which never have a payload
+_PANIC_PACKET = HEADER_STRUCT.pack(MessageID.REQUEST_PANIC, 0, 0)
+_PING_PACKET = HEADER_STRUCT.pack(MessageID.REQUEST_PING, 0, 0)
+_RESTORE_DEFAULT_CONFIG_PACKET = HEADER_STRUCT.pack(MessageID.REQUEST_RESTORE_DEFAULT_CONFIG, 0, 0)
+_AUTOKEY_COUNT_PACKET = HEADER_STRUCT.pack(MessageID.REQUEST_AUTOKEY_COUNT, 0, 0)
+_GET_BUZZER_ENABLED_PACKET = HEADER_STRUCT.pack(MessageID.REQUEST_GET_BUZZER_ENABLED, 0, 0)
+_GET_BUZZER_FREQUENCY_PACKET = HEADER_STRUCT.pack(MessageID.REQUEST_GET_BUZZER_FREQUENCY, 0, 0)
+_GET_HUMANIZER_LEVEL_PACKET = HEADER_STRUCT.pack(MessageID.REQUEST_GET_HUMANIZER_LEVEL, 0, 0)
+_GET_INVERT_PADDLES_PACKET = HEADER_STRUCT.pack(MessageID.REQUEST_GET_INVERT_PADDLES, 0, 0)
+_GET_PADDLE_MODE_PACKET = HEADER_STRUCT.pack(MessageID.REQUEST_GET_PADDLE_MODE, 0, 0)
+_GET_TRAINER_MODE_PACKET = HEADER_STRUCT.pack(MessageID.REQUEST_GET_TRAINER_MODE, 0, 0)
+_GET_WPM_PACKET = HEADER_STRUCT.pack(MessageID.REQUEST_GET_WPM, 0, 0)
+_VERSION_PACKET = HEADER_STRUCT.pack(MessageID.REQUEST_VERSION, 0, 0)
+
+# Prebuilt packets for setters whose only payload is a boolean, indexed by the value
+_SET_BUZZER_ENABLED_PACKETS = (HEADER_STRUCT.pack(MessageID.REQUEST_SET_BUZZER_ENABLED, 1, crc16_u8(0)) + b'\x00',
+                               HEADER_STRUCT.pack(MessageID.REQUEST_SET_BUZZER_ENABLED, 1, crc16_u8(1)) + b'\x01')
+_SET_INVERT_PADDLES_PACKETS = (HEADER_STRUCT.pack(MessageID.REQUEST_SET_INVERT_PADDLES, 1, crc16_u8(0)) + b'\x00',
+                               HEADER_STRUCT.pack(MessageID.REQUEST_SET_INVERT_PADDLES, 1, crc16_u8(1)) + b'\x01')
+_SET_TRAINER_MODE_PACKETS = (HEADER_STRUCT.pack(MessageID.REQUEST_SET_TRAINER_MODE, 1, crc16_u8(0)) + b'\x00',
+                             HEADER_STRUCT.pack(MessageID.REQUEST_SET_TRAINER_MODE, 1, crc16_u8(1)) + b'\x01')
+
+# Request message ID for the most frequently sent command as a plain integer, so it skips the `MessageID` enum
+_REQUEST_AUTOKEY_EX = int(MessageID.REQUEST_AUTOKEY_EX)
+
+# Bit mask for each autokey flag
+_AUTOKEY_FLAG_MASKS = {flag: 1 << int(flag) for flag in AutokeyFlag}
+
+# Reply message IDs as plain integers, so replies can be checked without going through the `MessageID` enum
+_REPLY_SUCCESS = int(MessageID.REPLY_SUCCESS)
+_REPLY_INVALID_MESSAGE = int(MessageID.REPLY_INVALID_MESSAGE)
+_REPLY_INVALID_SIZE = int(MessageID.REPLY_INVALID_SIZE)
+_REPLY_INVALID_CRC = int(MessageID.REPLY_INVALID_CRC)
+_REPLY_INVALID_PAYLOAD = int(MessageID.REPLY_INVALID_PAYLOAD)
+_REPLY_INVALID_VALUE = int(MessageID.REPLY_INVALID_VALUE)
+
+# ----------------------------------------------------- PROCEDURES -----------------------------------------------------
+
+def _pack_autokey_packet(string: str, flags: Iterable[AutokeyFlag]) -> bytearray:
+    """
+    Returns a complete `REQUEST_AUTOKEY_EX` packet for the specified string and flags.
+    """
+    # Get flag byte, setting each flag's precomputed bit
+    flag_byte = 0
+    for flag in flags:
+        flag_byte |= _AUTOKEY_FLAG_MASKS[flag]
+
+    # Assemble the packet in a single buffer - the payload is the flags, then the string, then a null terminator
+    encoded = string.encode('ascii')
+    packet = bytearray(HEADER_STRUCT_SIZE + 1 + len(encoded) + 1)
+    packet[HEADER_STRUCT_SIZE] = flag_byte
+    packet[HEADER_STRUCT_SIZE + 1:-1] = encoded
+
+    # Fill in the header in place
+    payload = memoryview(packet)[HEADER_STRUCT_SIZE:]
+    HEADER_STRUCT.pack_into(packet, 0, _REQUEST_AUTOKEY_EX, len(payload), crc16(payload))
+    return packet
+
+
+def _pack_packet(message: MessageID, payload: bytes) -> bytes:
+    """
+    Returns a complete packet (header followed by payload) with the specified message ID and payload.
+    """
+    # One- and two-byte payloads (the most common kinds) have precomputed CRC tables
+    size = len(payload)
+    if size == 1:
+        crc = crc16_u8(payload[0])
+    elif size == 2:
+        crc = crc16_u16(payload[0] | payload[1] << 8)
+    else:
+        crc = crc16(payload)
+    return _pack_header(message, size, crc) + payload
+
+
+def _pack_header(message: int, size: int, crc: int) -> bytes:
+    """
+    Returns a correctly formatted header struct with the specified values.
+    """
+    return HEADER_STRUCT.pack(message, size, crc)
+
+
+def _unpack_header(buffer: bytes | bytearray) -> Tuple[int, int, int]:
+    """
+    Unpacks the specified header struct and returns the parsed values.
+    """
+    return HEADER_STRUCT.unpack(buffer)
 
 # ------------------------------------------------------- TYPES --------------------------------------------------------
 
@@ -84,6 +195,15 @@ class Interface:
     """
     Class encapsulating the serial interface provided by the SuperKey hardware.
     """
+    # Exception types for each failure reply
+    __REPLY_ERRORS = {
+        _REPLY_INVALID_MESSAGE:     InvalidMessageError,
+        _REPLY_INVALID_SIZE:        InvalidSizeError,
+        _REPLY_INVALID_CRC:         InvalidCRCError,
+        _REPLY_INVALID_PAYLOAD:     InvalidPayloadError,
+        _REPLY_INVALID_VALUE:       InvalidValueError,
+    }
+
     def __init__(self,
                  port: str = SUPERKEY_DEFAULT_PORT,
                  baudrate: int = SUPERKEY_DEFAULT_BAUDRATE,
@@ -95,20 +215,40 @@ class Interface:
         self.baudrate = baudrate
         self.timeout = timeout
         self.serial = None
+        self.__header_buffer = bytearray(HEADER_STRUCT_SIZE)
+        self.__batch_replies = None
+        self.__batch_buffer = None
+        self.__batch_accepted = 0
+        self.__unbind_serial()
 
     def __enter__(self):
         """
         Acquires the serial port.
         """
-        self.serial = serial.Serial(port=self.port, baudrate=self.baudrate, timeout=self.timeout)
+        # Flow control is disabled explicitly (the device doesn't use it), and writes are bounded by the same timeout as
+        # reads, so a stalled port raises an error instead of blocking forever
+        self.serial = serial.Serial(port=self.port,
+                                    baudrate=self.baudrate,
+                                    timeout=self.timeout,
+                                    write_timeout=self.timeout,
+                                    inter_byte_timeout=None,
+                                    xonxoff=False,
+                                    rtscts=False,
+                                    dsrdtr=False)
         if not self.serial.is_open:
             raise InterfaceError("Failed to open serial port!")
+
+        # Bind the serial port's I/O methods once, so they don't need to be looked up for every transaction
+        self.__write = self.serial.write
+        self.__read = self.serial.read
+        self.__readinto = self.serial.readinto
         return self
 
     def __exit__(self, exc_type, exc_value, traceback):
         """
         Releases the serial port.
         """
+        self.__unbind_serial()
         if self.serial is not None and self.serial.is_open:
             self.serial.close()
 
@@ -116,236 +256,297 @@ class Interface:
         """
         Sends the `REQUEST_AUTOKEY_EX` command. Queues the specified string to be automatically keyed.
         """
-        # Get flag byte, setting each bit individually
-        flag_byte = 0
-        for flag in flags:
-            flag_byte = flag_byte | (1 << int(flag))
-
-        # Assemble payload
-        payload = (struct.pack('<B', flag_byte) +           # First byte is flags
-                   bytes(string, encoding='ascii') +        # Then the string
-                   b'\x00')                                 # Null terminator needs to be added manually
-
         # Send packet and check reply
-        self.__send_packet(MessageID.REQUEST_AUTOKEY_EX, payload)
+        self.__send(_pack_autokey_packet(string, flags))
         self.__check_reply_empty()
 
         # If blocking was selected, wait for autokey to complete
         if block:
             self.autokey_wait()
 
+    def autokey_batch(self, segments: Iterable[Tuple[str, Iterable[AutokeyFlag]]], block: bool = False):
+        """
+        Sends one `REQUEST_AUTOKEY_EX` command for each `(string, flags)` segment. All of the commands are transmitted
+        in a single write before any replies are checked. If any command fails, the first error is raised once all
+        replies have been received.
+        """
+        # Assemble and send all packets at once
+        packets = [_pack_autokey_packet(string, flags) for string, flags in segments]
+        self.__send(b''.join(packets))
+
+        # Check every reply so that none are left pending on the serial port
+        self.__check_replies_empty(len(packets))
+
+        # If blocking was selected, wait for autokey to complete
+        if block:
+            self.autokey_wait()
+
     def autokey_count(self) -> int:
         """
         Sends the `REQUEST_AUTOKEY_COUNT` command. Returns the number of Morse code elements in the autokey buffer.
         """
-        self.__send_packet(MessageID.REQUEST_AUTOKEY_COUNT)
-        return self.__check_reply('<H')[0]
+        self.__send(_AUTOKEY_COUNT_PACKET)
+        return self.__check_reply(_U16_STRUCT)[0]
 
     def autokey_quick_msg(self, index: int):
         """
         Sends the `REQUEST_AUTOKEY_QUICK_MSG` command. Keys a quick message.
         """
-        self.__send_packet(MessageID.REQUEST_AUTOKEY_QUICK_MSG, struct.pack('<B', index))
+        self.__send_packet(MessageID.REQUEST_AUTOKEY_QUICK_MSG, _U8_STRUCT.pack(index))
         self.__check_reply_empty()
 
-    def autokey_wait(self, delay: float = 0.1):
+    def autokey_wait(self, delay: float = 0.1, max_delay: float = 1.0):
         """
         Waits until the autokey buffer is empty.
-        NOTE: This is not an interface call - it periodically polls `autokey_count()`.
+        NOTE: This is not an interface call - it periodically polls `autokey_count()`. The first poll interval is
+        `delay` seconds. Once the buffer is seen draining, each poll is scheduled halfway to the estimated completion
+        time (but no more than `max_delay` seconds away), so long messages need far fewer polls.
         """
-        while self.autokey_count() != 0:
+        count = self.autokey_count()
+        last_time = time.monotonic()
+        while count != 0:
             time.sleep(delay)
+            last_count = count
+            count = self.autokey_count()
+            now = time.monotonic()
+
+            # Estimate the remaining time from the rate at which the buffer drained since the last poll
+            drained = last_count - count
+            if drained > 0:
+                remaining = count * (now - last_time) / drained
+                delay = min(max(0.5 * remaining, AUTOKEY_WAIT_MINIMUM_DELAY), max_delay)
+            last_time = now
+
+    @contextlib.contextmanager
+    def batch(self):
+        """
+        Returns a context manager which batches commands. Commands sent inside the `with` block are buffered, and are
+        transmitted in a single write when the block exits. Their replies are then checked, and if any command failed,
+        the first error is raised once all replies have been received. If the block raises an exception, none of the
+        buffered commands are sent. Only commands with empty replies (e.g., setters) may be batched.
+
+        Example usage:
+        ```
+        with intf.batch():
+            intf.set_buzzer_frequency(800)
+            intf.set_buzzer_enabled(True)
+            intf.autokey('cq')
+        ```
+        """
+        if self.__batch_replies is not None:
+            raise InterfaceError('A batch is already in progress.')
+
+        # Redirect writes into a buffer, and count replies instead of receiving them
+        buffer = bytearray()
+        write = self.__write
+        self.__write = buffer.extend
+        self.__batch_replies = 0
+        self.__batch_buffer = buffer
+        self.__batch_accepted = 0
+        try:
+            yield self
+            replies = self.__batch_replies
+        finally:
+            self.__write = write
+            self.__batch_replies = None
+            self.__batch_buffer = None
+
+        # Send everything at once, then check all of the replies (an empty batch sends nothing)
+        if replies:
+            self.__send(buffer)
+            self.__check_replies_empty(replies)
 
     def get_buzzer_enabled(self) -> bool:
         """
         Sends the `REQUEST_GET_BUZZER_ENABLED` command. Returns whether the buzzer is enabled or not.
         """
-        self.__send_packet(MessageID.REQUEST_GET_BUZZER_ENABLED)
-        return self.__check_reply('<?')[0]
+        self.__send(_GET_BUZZER_ENABLED_PACKET)
+        return self.__check_reply(_BOOL_STRUCT)[0]
 
     def get_buzzer_frequency(self) -> int:
         """
         Sends the `REQUEST_GET_BUZZER_FREQUENCY` command. Returns the current buzzer frequency, in Hz.
         """
-        self.__send_packet(MessageID.REQUEST_GET_BUZZER_FREQUENCY)
-        return self.__check_reply('<H')[0]
+        self.__send(_GET_BUZZER_FREQUENCY_PACKET)
+        return self.__check_reply(_U16_STRUCT)[0]
 
     def get_humanizer_level(self) -> float:
         """
         Sends the `REQUEST_GET_HUMANIZER_LEVEL` command. Returns the current humanizer level as a fraction.
         """
-        self.__send_packet(MessageID.REQUEST_GET_HUMANIZER_LEVEL)
-        return self.__check_reply('<f')[0]
+        self.__send(_GET_HUMANIZER_LEVEL_PACKET)
+        return self.__check_reply(_F32_STRUCT)[0]
 
     def get_invert_paddles(self) -> bool:
         """
         Sends the `REQUEST_GET_INVERT_PADDLES` command. Returns whether or not the paddles are inverted.
         """
-        self.__send_packet(MessageID.REQUEST_GET_INVERT_PADDLES)
-        return self.__check_reply('<?')[0]
+        self.__send(_GET_INVERT_PADDLES_PACKET)
+        return self.__check_reply(_BOOL_STRUCT)[0]
 
     def get_io_polarity(self, pin: IOPin) -> IOPolarity:
         """
         Sends the `REQUEST_GET_IO_POLARITY` command. Returns the polarity of the specified I/O pin.
         """
-        self.__send_packet(MessageID.REQUEST_GET_IO_POLARITY, struct.pack('<B', pin))
-        return IOPolarity(self.__check_reply('<B')[0])
+        self.__send_packet(MessageID.REQUEST_GET_IO_POLARITY, _U8_STRUCT.pack(pin))
+        return IOPolarity(self.__check_reply(_U8_STRUCT)[0])
 
     def get_io_state(self, pin: IOPin) -> IOPin:
         """
         Sends the `REQUEST_GET_IO_STATE` command. Returns `true` if the specified input / output pin is active.
         """
-        self.__send_packet(MessageID.REQUEST_GET_IO_STATE, struct.pack('<B', pin))
-        return self.__check_reply('<?')[0]
+        self.__send_packet(MessageID.REQUEST_GET_IO_STATE, _U8_STRUCT.pack(pin))
+        return self.__check_reply(_BOOL_STRUCT)[0]
 
     def get_io_state_for_type(self, type: IOType) -> IOType:
         """
         Sends the `REQUEST_GET_IO_STATE_FOR_TYPE` command. Returns `true` if any I/O pin with the specified type is on.
         """
-        self.__send_packet(MessageID.REQUEST_GET_IO_STATE_FOR_TYPE, struct.pack('<B', type))
-        return self.__check_reply('<?')[0]
+        self.__send_packet(MessageID.REQUEST_GET_IO_STATE_FOR_TYPE, _U8_STRUCT.pack(type))
+        return self.__check_reply(_BOOL_STRUCT)[0]
 
     def get_io_type(self, pin: IOPin) -> IOType:
         """
         Sends the `REQUEST_GET_IO_TYPE` command. Returns the type of the specified I/O pin.
         """
-        self.__send_packet(MessageID.REQUEST_GET_IO_TYPE, struct.pack('<B', pin))
-        return IOType(self.__check_reply('<B')[0])
+        self.__send_packet(MessageID.REQUEST_GET_IO_TYPE, _U8_STRUCT.pack(pin))
+        return IOType(self.__check_reply(_U8_STRUCT)[0])
 
     def get_led_enabled(self, led: LED) -> bool:
         """
         Sends the `REQUEST_GET_LED_ENABLED` command. Returns whether or not the specified LED is enabled.
         """
-        self.__send_packet(MessageID.REQUEST_GET_LED_ENABLED, struct.pack('<b', led))
-        return self.__check_reply('<?')[0]
+        self.__send_packet(MessageID.REQUEST_GET_LED_ENABLED, _I8_STRUCT.pack(led))
+        return self.__check_reply(_BOOL_STRUCT)[0]
 
     def get_paddle_mode(self) -> PaddleMode:
         """
         Sends the `REQUEST_GET_PADDLE_MODE` command. Returns the currently selected paddle mode.
         """
-        self.__send_packet(MessageID.REQUEST_GET_PADDLE_MODE)
-        return PaddleMode(self.__check_reply('<B')[0])
+        self.__send(_GET_PADDLE_MODE_PACKET)
+        return PaddleMode(self.__check_reply(_U8_STRUCT)[0])
 
     def get_quick_msg(self, index: int) -> str:
         """
         Sends the `REQUEST_GET_QUICK_MSG` command. Returns the text of the specified quick message.
         """
-        self.__send_packet(MessageID.REQUEST_GET_QUICK_MSG, struct.pack('<B', index))
-        return str(self.__check_reply(), encoding='ascii')[:-1]
+        self.__send_packet(MessageID.REQUEST_GET_QUICK_MSG, _U8_STRUCT.pack(index))
+        # Drop the null terminator before decoding, rather than slicing the decoded string
+        return self.__check_reply()[:-1].decode('ascii')
 
     def get_trainer_mode(self) -> bool:
         """
         Sends the `REQUEST_GET_TRAINER_MODE` command. Returns whether trainer mode is enabled or not.
         """
-        self.__send_packet(MessageID.REQUEST_GET_TRAINER_MODE)
-        return self.__check_reply('<?')[0]
+        self.__send(_GET_TRAINER_MODE_PACKET)
+        return self.__check_reply(_BOOL_STRUCT)[0]
 
     def get_wpm(self) -> float:
         """
         Sends the `REQUEST_GET_WPM` command. Returns the current WPM setting.
         """
-        self.__send_packet(MessageID.REQUEST_GET_WPM)
-        return self.__check_reply('<f')[0]
+        self.__send(_GET_WPM_PACKET)
+        return self.__check_reply(_F32_STRUCT)[0]
 
     def get_wpm_scale(self, element: CodeElement) -> float:
         """
         Sends the `REQUEST_GET_WPM_SCALE` command. Returns the current WPM scale for the specified code element.
         """
-        self.__send_packet(MessageID.REQUEST_GET_WPM_SCALE, struct.pack('<B', element))
-        return self.__check_reply('<f')[0]
+        self.__send_packet(MessageID.REQUEST_GET_WPM_SCALE, _U8_STRUCT.pack(element))
+        return self.__check_reply(_F32_STRUCT)[0]
 
     def invalidate_quick_msg(self, idx: int):
         """
         Sends the `REQUEST_INVALIDATE_QUICK_MSG` command. Deletes the specified quick message.
         """
-        self.__send_packet(MessageID.REQUEST_INVALIDATE_QUICK_MSG, struct.pack('<B', idx))
+        self.__send_packet(MessageID.REQUEST_INVALIDATE_QUICK_MSG, _U8_STRUCT.pack(idx))
         self.__check_reply_empty()
 
     def panic(self):
         """
         Sends the `REQUEST_PANIC` command. Immediately and unconditionally stops keying.
         """
-        self.__send_packet(MessageID.REQUEST_PANIC)
+        self.__send(_PANIC_PACKET)
         self.__check_reply_empty()
 
     def ping(self):
         """
         Sends the `REQUEST_PING` command. Keys a short test message.
         """
-        self.__send_packet(MessageID.REQUEST_PING)
+        self.__send(_PING_PACKET)
         self.__check_reply_empty()
 
     def restore_default_config(self):
         """
         Sends the `REQUEST_RESTORE_DEFAULT_CONFIG` command. Restores the device to its default configuration.
         """
-        self.__send_packet(MessageID.REQUEST_RESTORE_DEFAULT_CONFIG)
+        self.__send(_RESTORE_DEFAULT_CONFIG_PACKET)
         self.__check_reply_empty()
 
     def set_buzzer_enabled(self, enabled: bool):
         """
         Sends the `REQUEST_SET_BUZZER_ENABLED` command. Enables or disables the device's built-in buzzer.
         """
-        self.__send_packet(MessageID.REQUEST_SET_BUZZER_ENABLED, struct.pack('<?', enabled))
+        self.__send(_SET_BUZZER_ENABLED_PACKETS[bool(enabled)])
         self.__check_reply_empty()
 
     def set_buzzer_frequency(self, frequency: int):
         """
         Sends the `REQUEST_SET_BUZZER_FREQUENCY` command. Sets the frequency (in Hz) of the device's built-in buzzer.
         """
-        self.__send_packet(MessageID.REQUEST_SET_BUZZER_FREQUENCY, struct.pack('<H', frequency))
+        self.__send_packet(MessageID.REQUEST_SET_BUZZER_FREQUENCY, _U16_STRUCT.pack(frequency))
         self.__check_reply_empty()
 
     def set_humanizer_level(self, level: float):
         """
         Sends the `REQUEST_SET_HUMANIZER_LEVEL` command. Sets the humanizer level as a fraction.
         """
-        self.__send_packet(MessageID.REQUEST_SET_HUMANIZER_LEVEL, struct.pack('<f', level))
+        self.__send_packet(MessageID.REQUEST_SET_HUMANIZER_LEVEL, _F32_STRUCT.pack(level))
         self.__check_reply_empty()
 
     def set_invert_paddles(self, inverted: bool):
         """
         Sends the `REQUEST_SET_INVERT_PADDLES` command. Sets whether the paddles are inverted.
         """
-        self.__send_packet(MessageID.REQUEST_SET_INVERT_PADDLES, struct.pack('<?', inverted))
+        self.__send(_SET_INVERT_PADDLES_PACKETS[bool(inverted)])
         self.__check_reply_empty()
 
     def set_io_polarity(self, pin: IOPin, polarity: IOPolarity):
         """
         Sends the `REQUEST_SET_IO_POLARITY` command. Sets the polarity of the specified I/O pin.
         """
-        self.__send_packet(MessageID.REQUEST_SET_IO_POLARITY, struct.pack('<BB', pin, polarity))
+        self.__send_packet(MessageID.REQUEST_SET_IO_POLARITY, _U8_U8_STRUCT.pack(pin, polarity))
         self.__check_reply_empty()
 
     def set_io_type(self, pin: IOPin, type: IOType):
         """
         Sends the `REQUEST_SET_IO_TYPE` command. Sets the type of the specified I/O pin.
         """
-        self.__send_packet(MessageID.REQUEST_SET_IO_TYPE, struct.pack('<BB', pin, type))
+        self.__send_packet(MessageID.REQUEST_SET_IO_TYPE, _U8_U8_STRUCT.pack(pin, type))
         self.__check_reply_empty()
 
     def set_led_enabled(self, led: LED, enabled: bool):
         """
         Sends the `REQUEST_SET_LED_ENABLED` command. Sets whether the specified LED is enabled or not.
         """
-        self.__send_packet(MessageID.REQUEST_SET_LED_ENABLED, struct.pack('<B?', led, enabled))
+        self.__send_packet(MessageID.REQUEST_SET_LED_ENABLED, _U8_BOOL_STRUCT.pack(led, enabled))
         self.__check_reply_empty()
 
     def set_paddle_mode(self, mode: PaddleMode):
         """
         Sends the `REQUEST_SET_PADDLE_MODE` command. Sets the current keyer paddle mode.
         """
-        self.__send_packet(MessageID.REQUEST_SET_PADDLE_MODE, struct.pack('<B', mode))
+        self.__send_packet(MessageID.REQUEST_SET_PADDLE_MODE, _U8_STRUCT.pack(mode))
         self.__check_reply_empty()
 
     def set_quick_msg(self, index: int, string: str):
         """
         Sends the `REQUEST_SET_QUICK_MSG` command. Sets the text of a quick message.
         """
-        # Assemble payload
-        payload = (struct.pack('<B', index) +               # First byte is index
-                   bytes(string, encoding='ascii') +        # Then the string
-                   b'\x00')                                 # Null terminator needs to be added manually
+        # Assemble payload in a single join, rather than creating intermediate buffers
+        payload = b''.join((_U8_STRUCT.pack(index),         # First byte is index
+                            string.encode('ascii'),         # Then the string
+                            b'\x00'))                       # Null terminator needs to be added manually
 
         # Send packet and check reply
         self.__send_packet(MessageID.REQUEST_SET_QUICK_MSG, payload)
@@ -355,82 +556,80 @@ class Interface:
         """
         Sends the `SET_TRAINER_MODE` command. Enables or disables trainer mode.
         """
-        self.__send_packet(MessageID.REQUEST_SET_TRAINER_MODE, struct.pack('<?', enabled))
+        self.__send(_SET_TRAINER_MODE_PACKETS[bool(enabled)])
         self.__check_reply_empty()
 
     def set_wpm(self, wpm: float):
         """
         Sends the `REQUEST_SET_WPM` command. Sets the keyer's WPM setting.
         """
-        self.__send_packet(MessageID.REQUEST_SET_WPM, struct.pack('<f', wpm))
+        self.__send_packet(MessageID.REQUEST_SET_WPM, _F32_STRUCT.pack(wpm))
         self.__check_reply_empty()
 
     def set_wpm_scale(self, element: CodeElement, scale: float):
         """
         Sends the `REQUEST_SET_WPM_SCALE` command. Sets the WPM scale for the specified code element.
         """
-        self.__send_packet(MessageID.REQUEST_SET_WPM_SCALE, struct.pack('<Bf', element, scale))
+        self.__send_packet(MessageID.REQUEST_SET_WPM_SCALE, _U8_F32_STRUCT.pack(element, scale))
         self.__check_reply_empty()
 
-    def version(self) -> str:
+    def version(self) -> Optional[str]:
         """
         Sends the `REQUEST_VERSION` command. Returns the device's version information.
         """
-        header = self.__class__.__pack_header(MessageID.REQUEST_VERSION)
-        self.__send(header)
-        return self.__check_reply_str()
+        self.__send(_VERSION_PACKET)
+        payload = self.__check_reply()
+        return payload.rstrip(b'\x00').decode('ascii') if payload is not None else None
+
+    def __unbind_serial(self):
+        """
+        Replaces the bound serial port I/O methods with methods which raise an error.
+        """
+        self.__write = self.__read = self.__readinto = self.__serial_not_open
 
-    def __validate_serial(self):
+    def __serial_not_open(self, *args, **kwargs):
         """
-        Raises an error if the serial port is not open.
+        Raises an error indicating that the serial port is not open.
         """
-        if self.serial is None:
-            raise InterfaceError("The serial port is not open.")
+        raise InterfaceError("The serial port is not open.")
 
     def __send(self, buffer: bytes):
         """
         Transmits the specified buffer.
         """
-        self.__validate_serial()
-        self.serial.write(buffer)
+        self.__write(buffer)
 
-    def __send_packet(self, message: MessageID, payload: Optional[bytes] = None):
+    def __send_packet(self, message: MessageID, payload: bytes):
         """
         Sends a packet with the specified message ID and payload.
         """
-        # Get header
-        size = 0
-        crc = 0
-        if payload is not None:
-            size = len(payload)
-            crc = self.__class__.__crc16(payload)
-        header = self.__class__.__pack_header(message, size, crc)
-
-        # Send data
-        self.__send(header)
-        if payload is not None:
-            self.__send(payload)
+        # Send the header and payload with a single write
+        self.__send(_pack_packet(message, payload))
 
     def __receive(self, size: int):
         """
         Receives the specified number of bytes.
         """
-        self.__validate_serial()
-        return self.serial.read(size=size)
+        return self.__read(size)
 
     def __receive_header(self):
         """
         Attempts to receive a header from the serial port.
         """
-        # Receive reply and verify we got enough data
-        reply = self.__receive(HEADER_STRUCT_SIZE)
-        if len(reply) != HEADER_STRUCT_SIZE:
+        # Replies with values can't be deferred, so they can't be batched - drop the request which was just buffered,
+        # so the batch stays consistent with its reply count if the caller handles this error and carries on
+        if self.__batch_replies is not None:
+            del self.__batch_buffer[self.__batch_accepted:]
+            raise InterfaceError('Commands which return a value cannot be batched.')
+
+        # Receive reply into the reusable header buffer and verify we got enough data
+        if self.__readinto(self.__header_buffer) != HEADER_STRUCT_SIZE:
             raise InterfaceError('No reply received.')
 
         # Unpack the header and verify the size and CRC are correct
-        return self.__class__.__unpack_header(reply)
+        return _unpack_header(self.__header_buffer)
 
-    def __check_reply(self, format: Optional[str] = None) -> Tuple[any, ...] | bytes:
+    def __check_reply(self, format: Optional[struct.Struct] = None) -> Tuple[any, ...] | bytes:
         """
         Attempts to receive a reply with a payload from the device.
         """
@@ -449,18 +648,18 @@ class Interface:
         self.__check_reply_message_id(message)
 
         # Check CRC
-        if payload is not None and self.__class__.__crc16(payload) != crc:
+        if payload is not None and crc16(payload) != crc:
             raise InterfaceError('Reply: Invalid CRC?')
 
         # Do we have a format string?
         if format is not None:
 
-            # Check payload length
-            if len(payload) != struct.calcsize(format):
+            # Check payload length (the received length was already verified against the header)
+            if size != format.size:
                 raise InterfaceError('Reply: Invalid payload?')
 
             # Unpack struct and return
-            return struct.unpack(format, payload)
+            return format.unpack(payload)
 
         else:
 
@@ -471,6 +670,12 @@ class Interface:
         """
         Attempts to receive a generic empty reply from the device.
         """
+        # Replies to batched commands are received once the batch has been sent
+        if self.__batch_replies is not None:
+            self.__batch_replies += 1
+            self.__batch_accepted = len(self.__batch_buffer)
+            return
+
         # Unpack message
         message, size, crc = self.__receive_header()
         if size != 0 or crc != 0:
@@ -479,83 +684,31 @@ class Interface:
         # Check the message ID
         self.__check_reply_message_id(message)
 
-    def __check_reply_str(self) -> Optional[str]:
+    def __check_replies_empty(self, count: int):
         """
-        Attempts to receive a reply with a string payload from the device.
+        Attempts to receive the specified number of generic empty replies from the device. All replies are received
+        (so none are left pending on the serial port) before the first error, if any, is raised.
         """
-        # Unpack header
-        message, size, crc = self.__receive_header()
+        error = None
+        for _ in range(count):
+            try:
+                self.__check_reply_empty()
+            except InterfaceError as e:
+                if error is None:
+                    error = e
+        if error is not None:
+            raise error
 
-        # Receive payload
-        if size != 0:
-            payload = self.__receive(size)
-            if len(payload) != size:
-                raise InterfaceError('No payload received.')
-        else:
-            return None
-
-        # Check the message ID
-        self.__check_reply_message_id(message)
-
-        # Check CRC
-        if self.__class__.__crc16(payload) != crc:
-            raise InterfaceError('Reply: Invalid CRC?')
-
-        return str(payload, encoding='ascii')
-
-    def __check_reply_message_id(self, message: MessageID):
+    def __check_reply_message_id(self, message: int):
         """
         Throws an exception if the specified message ID represent a failure.
         """
-        if message == MessageID.REPLY_SUCCESS:
+        if message == _REPLY_SUCCESS:
             return # no error
-        elif message == MessageID.REPLY_INVALID_MESSAGE:
-            raise InvalidMessageError()
-        elif message == MessageID.REPLY_INVALID_SIZE:
-            raise InvalidSizeError()
-        elif message == MessageID.REPLY_INVALID_CRC:
-            raise InvalidCRCError()
-        elif message == MessageID.REPLY_INVALID_PAYLOAD:
-            raise InvalidPayloadError()
-        elif message == MessageID.REPLY_INVALID_VALUE:
-            raise InvalidValueError()
-        else:
+        error = self.__REPLY_ERRORS.get(message)
+        if error is None:
             raise InterfaceError('Reply: Unknown reply?')
-
-    @staticmethod
-    def __crc16(buffer: bytes, seed: int = 0xFFFF):
-        """
-        Returns a 16-bit CRC for the specified buffer.
-        """
-        # Adapted from avrlibc _crc16_update implementation
-        def update(crc: int, b: int) -> int:
-            crc ^= b & 0xFF
-            for _ in range(8):
-                if crc & 1:
-                    crc = (crc >> 1) ^ 0xA001
-                else:
-                    crc >>= 1
-            return crc & 0xFFFF
-
-        # Calculate and return CRC
-        crc = seed
-        for b in buffer:
-            crc = update(crc, b)
-        return crc
-
-    @staticmethod
-    def __pack_header(message: int, size: int = 0, crc: int = 0) -> bytes:
-        """
-        Returns a correctly formatted header struct with the specified values.
-        """
-        return struct.pack(HEADER_STRUCT_FORMAT, message, size, crc)
-
-    @staticmethod
-    def __unpack_header(buffer: bytes) -> Tuple[int, int, int]:
-        """
-        Unpacks the specified header struct and returns the parsed values.
-        """
-        return struct.unpack(HEADER_STRUCT_FORMAT, buffer)
+        raise error()
 
 
 class InteractiveInterface:
@@ -563,9 +716,10 @@ class InteractiveInterface:
     Class acting as a proxy for `Interface`, wrapping each function call in a serial port transaction.
 
     This is intended as a convenience to improve the syntax for **occasional** commands (e.g., in an interactive Python
-    terminal). It allows sending commands to the SuperKey without having to wrap each command in a `with` block. It
+    terminal). It allows sending commands to the SuperKey without having to wrap each command in a `with` block. The
+    serial port is opened on demand, and closed again once no commands have been sent for `idle_timeout` seconds. It
     should not be used in normal scripts, as there is significant overhead in repeatedly opening and closing the serial
-    port for every command.
+    port.
 
     Example usage:
     ```
@@ -575,22 +729,60 @@ class InteractiveInterface:
     intf.set_buzzer_enabled(True)
     ```
     """
-    def __init__(self, *args, **kwargs):
+    # Names of the public methods of `Interface` which are proxied by this class
+    PUBLIC_METHODS = tuple(name for name, _ in inspect.getmembers(Interface, predicate=inspect.isfunction)
+                           if not name.startswith('_') and name not in _INTERACTIVE_UNPROXIED_METHODS)
+
+    def __init__(self, *args, idle_timeout: float = INTERACTIVE_DEFAULT_IDLE_TIMEOUT, **kwargs):
         """
         Initializes a new instance with the specified serial port configuration.
         """
         self.__intf = Interface(*args, **kwargs)
+        self.__idle_timeout = idle_timeout
+        self.__lock = threading.Lock()
+        self.__is_open = False
+        self.__close_timer = None
 
     def __getattr__(self, name: str):
         """
         Gets the specified attribute.
         """
+        if name in _INTERACTIVE_UNPROXIED_METHODS:
+            raise AttributeError(f'{name} spans several commands, so it is not available from InteractiveInterface.')
         attr = getattr(self.__intf, name)
         if callable(attr):
             def wrapper(*args, **kwargs):
-                with self.__intf as _:
-                    return attr(*args, **kwargs)
+                with self.__lock:
+                    if not self.__is_open:
+                        self.__intf.__enter__()
+                        self.__is_open = True
+                    try:
+                        return attr(*args, **kwargs)
+                    finally:
+                        self.__schedule_close()
             wrapper.__doc__ = attr.__doc__
+            # Cache the wrapper on this instance, so future lookups don't need to go through this method
+            self.__dict__[name] = wrapper
             return wrapper
         else:
             return attr
+
+    def __schedule_close(self):
+        """
+        Schedules the serial port to be closed once the idle timeout expires, cancelling any previous schedule.
+        """
+        if self.__close_timer is not None:
+            self.__close_timer.cancel()
+        self.__close_timer = threading.Timer(self.__idle_timeout, self.__close)
+        self.__close_timer.daemon = True
+        self.__close_timer.start()
+
+    def __close(self):
+        """
+        Closes the serial port, unless another command has been sent since the close was scheduled.
+        """
+        with self.__lock:
+            # A timer which fired while a command was running can't be cancelled, but it is no longer the current one
+            if self.__close_timer is threading.current_thread() and self.__is_open:
+                self.__intf.__exit__(None, None, None)
+                self.__is_open = False
@@ -1,5 +1,5 @@
 #
-# @file     scripts/superkey/superkey_types.py
+# @file     scripts/superkey/types.py
 # @brief    Module defining common types for the SuperKey interface.
 #
 # @author   Chris Vig (chris@invictus.so)
@@ -9,48 +9,123 @@
 
 # ------------------------------------------------------ IMPORTS -------------------------------------------------------
 
+import bisect
+import functools
+import hashlib
+import os
 import random
+import tempfile
+import time
+from typing import Optional
 from urllib import request
 
 # ------------------------------------------------------ EXPORTS -------------------------------------------------------
 
 __all__ = [
-    'WordList'
+    'WordList',
+    'default',
 ]
 
 # ----------------------------------------------------- CONSTANTS ------------------------------------------------------
 
 DEFAULT_WORD_LIST_URL = 'https://raw.githubusercontent.com/first20hours/google-10000-english/refs/heads/master/google-10000-english-usa-no-swears.txt'
 
+# Directory in which downloaded word lists are cached
+DEFAULT_CACHE_DIR = os.path.join(os.environ.get('LOCALAPPDATA') or
+                                 os.environ.get('XDG_CACHE_HOME') or
+                                 os.path.join(os.path.expanduser('~'), '.cache'),
+                                 'superkey',
+                                 'wordlist')
+
+# Time (in seconds) for which a cached word list is used before it is downloaded again
+DEFAULT_CACHE_TTL = 7 * 24 * 60 * 60.
+
+# ------------------------------------------------------ GLOBALS -------------------------------------------------------
+
+# Shared word list returned by `default()`
+_default_word_list: Optional['WordList'] = None
+
+# ----------------------------------------------------- PROCEDURES -----------------------------------------------------
+
+def _load(url: str, cache_dir: Optional[str], cache_ttl: float) -> bytes:
+    """
+    Returns the contents of the file at the specified URL, using the cached copy in `cache_dir` if it is fresh enough.
+    """
+    # Without a cache directory, always download the file
+    if cache_dir is None:
+        with request.urlopen(url) as response:
+            return response.read()
+
+    # Use the cached copy if it hasn't expired
+    cache_path = os.path.join(cache_dir, hashlib.sha1(url.encode('utf8')).hexdigest())
+    try:
+        if time.time() - os.path.getmtime(cache_path) < cache_ttl:
+            with open(cache_path, 'rb') as file:
+                return file.read()
+    except OSError:
+        pass
+
+    # Otherwise download the file, falling back to an expired cached copy if that fails
+    try:
+        with request.urlopen(url) as response:
+            data = response.read()
+    except OSError:
+        try:
+            with open(cache_path, 'rb') as file:
+                return file.read()
+        except OSError:
+            pass
+        raise
+
+    # Update the cache atomically, so a concurrent or interrupted run never sees a partial file
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=cache_dir, delete=False) as file:
+            file.write(data)
+        os.replace(file.name, cache_path)
+    except OSError:
+        pass
+
+    return data
+
+def default(url: str = DEFAULT_WORD_LIST_URL) -> 'WordList':
+    """
+    Returns a word list for the specified URL which is shared by all callers in this process. It is only loaded the
+    first time it is requested (or when a different URL is requested).
+    """
+    global _default_word_list
+    if _default_word_list is None or _default_word_list.url != url:
+        _default_word_list = WordList(url)
+    return _default_word_list
+
+
 # ------------------------------------------------------- TYPES --------------------------------------------------------
 
 class WordList:
     """
     Class providing access to a list of words which may be selected from randomly.
     """
-    def __init__(self, url: str = DEFAULT_WORD_LIST_URL):
+    def __init__(self,
+                 url: str = DEFAULT_WORD_LIST_URL,
+                 cache_dir: Optional[str] = DEFAULT_CACHE_DIR,
+                 cache_ttl: float = DEFAULT_CACHE_TTL,
+                 seed: Optional[int] = None):
         """
-        Initializes a new instance using the file at the specified URL.
+        Initializes a new instance using the file at the specified URL. The file is cached in `cache_dir` (unless it is
+        `None`) and is only downloaded again once the cached copy is older than `cache_ttl` seconds. Words are selected
+        using a random number generator initialized with `seed` (or system entropy, if it is `None`).
         """
-        # Load file from URL
+        # Load file from URL (or cache)
         self.url = url
-        with request.urlopen(url) as response:
-            data = response.read()
+        data = _load(url, cache_dir, cache_ttl)
 
         # Get word list by splitting up lines
+        # (the length index below is only built if a word with a length constraint is requested)
         self.words = str(data, encoding='utf8').splitlines()
 
-        # Get word list sorted by length and determine minimum and maximum
-        self.words_by_length = sorted(self.words, key=len)
-        self.min_length = len(self.words_by_length[0])
-        self.max_length = len(self.words_by_length[-1])
-
-        # Find start index for each length
-        self.words_by_length_indices = { }
-        for idx, word in enumerate(self.words_by_length):
-            for length in range(self.min_length, len(word) + 1):
-                if length not in self.words_by_length_indices:
-                    self.words_by_length_indices[length] = idx
+        # Each instance has its own random number generator, and remembers the words matching each length constraint
+        self.rng = random.Random(seed)
+        self.__buckets = { }
 
     def __len__(self):
         """
@@ -58,28 +133,79 @@ class WordList:
         """
         return len(self.words)
 
+    @functools.cached_property
+    def words_by_length(self) -> list[str]:
+        """
+        The words in this word list, sorted by length.
+        """
+        # Word lengths fall in a small range, so bucketing the words by length (a counting sort) is faster than a
+        # comparison sort, and keeps words of the same length in their original order just like a stable sort would
+        buckets = { }
+        for word in self.words:
+            bucket = buckets.get(len(word))
+            if bucket is None:
+                buckets[len(word)] = [word]
+            else:
+                bucket.append(word)
+        return [word for length in sorted(buckets) for word in buckets[length]]
+
+    @functools.cached_property
+    def lengths(self) -> list[int]:
+        """
+        The length of each word in `words_by_length`, so start indices can be found with a binary search.
+        """
+        return [len(word) for word in self.words_by_length]
+
+    @functools.cached_property
+    def min_length(self) -> int:
+        """
+        The length of the shortest word in this word list.
+        """
+        return self.lengths[0]
+
+    @functools.cached_property
+    def max_length(self) -> int:
+        """
+        The length of the longest word in this word list.
+        """
+        return self.lengths[-1]
+
     def _start_idx(self, length: int) -> int:
         """
         Returns the start index in the sorted list for words with the specified length.
         """
-        if length < self.min_length:
-            return 0
-        elif length > self.max_length:
-            return len(self)
-        else:
-            return self.words_by_length_indices[length]
+        return bisect.bisect_left(self.lengths, length)
 
     def random(self, min_length: int = None, max_length: int = None):
         """
         Returns a randomly selected word from this word list.
         """
-        # Sanity check range
-        if min_length is None or min_length < self.min_length:
-            min_length = self.min_length
-        if max_length is None or max_length > self.max_length:
-            max_length = self.max_length
+        # Without a length constraint, there's no need for the sorted list
+        if min_length is None and max_length is None:
+            return self.rng.choice(self.words)
+
+        # Select from the words with the requested lengths
+        return self.rng.choice(self.__bucket(min_length, max_length))
+
+    def random_many(self, count: int, min_length: int = None, max_length: int = None) -> list[str]:
+        """
+        Returns a list of `count` randomly selected words (with replacement) from this word list.
+        """
+        # Without a length constraint, there's no need for the sorted list
+        if min_length is None and max_length is None:
+            return self.rng.choices(self.words, k=count)
+
+        # Select all of the words with the requested lengths at once
+        return self.rng.choices(self.__bucket(min_length, max_length), k=count)
 
-        # Get indices in the sorted list for the requested lengths
-        start_idx = self._start_idx(min_length)
-        end_idx = self._start_idx(max_length + 1)
-        return self.words_by_length[random.randrange(start_idx, end_idx)]
+    def __bucket(self, min_length: Optional[int], max_length: Optional[int]) -> list[str]:
+        """
+        Returns the list of words within the specified length constraint.
+        """
+        key = (min_length, max_length)
+        bucket = self.__buckets.get(key)
+        if bucket is None:
+            start_idx = self._start_idx(min_length) if min_length is not None else 0
+            end_idx = self._start_idx(max_length + 1) if max_length is not None else len(self)
+            bucket = self.__buckets[key] = self.words_by_length[start_idx:end_idx]
+        return bucket
@@ -10,6 +10,8 @@
 # ------------------------------------------------------ IMPORTS -------------------------------------------------------
 
 import argparse
+import concurrent.futures
+import threading
 import time
 
 from superkey import *
@@ -46,6 +48,28 @@ def _parse_args():
     parser.add_argument('--trainer', action=argparse.BooleanOptionalAction, default=DEFAULT_TRAINER, help='Use trainer mode?')
     return parser.parse_args()
 
+def _sleep_until(deadline: float):
+    """
+    Sleeps until the specified `time.monotonic()` deadline, returning immediately if it has already passed.
+    """
+    remaining = deadline - time.monotonic()
+    if remaining > 0:
+        time.sleep(remaining)
+
+def _run_in_background(function) -> concurrent.futures.Future:
+    """
+    Calls `function` on a daemon thread, returning a future for its result. Unlike an executor's worker, the thread
+    does not keep the process alive if the script exits (e.g. if the serial port fails to open) before it finishes.
+    """
+    future = concurrent.futures.Future()
+    def run():
+        try:
+            future.set_result(function())
+        except BaseException as error:
+            future.set_exception(error)
+    threading.Thread(target=run, daemon=True).start()
+    return future
+
 def _main(port: str,
           baudrate: int,
           timeout: float,
@@ -60,8 +84,8 @@ def _main(port: str,
     """
     Runs the trainer.
     """
-    # Build word list
-    wl = wordlist.WordList()
+    # Start building the word list in the background (it may need to be downloaded) while the serial port is opened
+    wl_future = _run_in_background(wordlist.default)
 
     # Open SuperKey interface
     with Interface(port = port, baudrate = baudrate, timeout = timeout) as intf:
@@ -73,24 +97,27 @@ def _main(port: str,
             initial_humanizer_level = intf.get_humanizer_level()
             initial_trainer_mode = intf.get_trainer_mode()
 
+            # Wait for the word list, then select all of the words and build every group up front
+            wl = wl_future.result()
+            words = wl.random_many(count * size, min_length=minlen, max_length=maxlen)
+            groups = [' '.join(words[idx:idx + size]).upper() for idx in range(0, len(words), size)]
+
             # Override settings
             intf.set_wpm(wpm)
             intf.set_humanizer_level(humanizer)
             if trainer:
                 intf.set_trainer_mode(True)
 
-            # Run as many times as commanded
-            for _ in range(count):
-
-                # Get a random word and key it
-                words = [wl.random(min_length=minlen, max_length=maxlen).upper() for _ in range(size)]
-                string = ' '.join(words)
+            # Key each group in turn
+            for string in groups:
                 intf.autokey(string, block=True)
 
-                # Print the word after a delay
-                time.sleep(delay)
+                # Print the word after a delay - both waits are measured from when keying finished, so the time
+                # spent printing doesn't accumulate
+                keyed_time = time.monotonic()
+                _sleep_until(keyed_time + delay)
                 print(string)
-                time.sleep(delay * .5)
+                _sleep_until(keyed_time + delay * 1.5)
 
         except KeyboardInterrupt:
 